@@ -3,10 +3,15 @@ import pandas as pd
 import datetime
 import requests
 import json
+import threading
+import time
 import numpy as np
 import plotly.graph_objects as go
 from io import StringIO
 from urllib.parse import urlencode
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from streamlit.runtime.scriptrunner import add_script_run_ctx
 
 # --- Configuration ---
 GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-preview-09-2025:generateContent"
@@ -14,23 +19,19 @@ GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini
 # hence it is set to an empty string as per instructions.
 API_KEY = ""
 MAX_ATTEMPTS = 3
+REQUEST_TIMEOUT = (3, 20) # (connect, read) seconds
+CACHE_MAX_ENTRIES = 32 # Per-function bound on cached chart/data results
 
 # --- Date Utilities ---
-def get_formatted_date(date_obj):
-    """Gets a date string in YYYY-MM-DD format."""
-    return date_obj.strftime("%Y-%m-%d")
-
-def add_days(date_string, days):
-    """Adds days to a date string (YYYY-MM-DD)."""
-    date = datetime.datetime.strptime(date_string, "%Y-%m-%d")
-    date += datetime.timedelta(days=days)
-    return get_formatted_date(date)
+# Read the clock once per script run; everything below compares against this
+NOW = datetime.datetime.now()
+TODAY_STR = NOW.date().isoformat()
 
 # --- State Management and Initialization ---
 
 INITIAL_TRACKER_DATA = {
     'config': {
-        'startDate': get_formatted_date(datetime.datetime.now()),
+        'startDate': TODAY_STR,
         'totalDays': 7,
     },
     'tasks': [
@@ -57,17 +58,35 @@ def init_state():
 
 init_state()
 tracker_data = st.session_state.tracker_data
-today = get_formatted_date(datetime.datetime.now())
 
 # --- Gemini LLM Integration ---
 
+@st.cache_resource
+def get_http_session():
+    """
+    Returns a pooled HTTP session shared across reruns.
+    Keeps the TLS connection to the Gemini host alive and lets urllib3
+    handle retries with exponential backoff.
+    """
+    retry = Retry(
+        total=MAX_ATTEMPTS - 1,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset(['POST']),
+    )
+    session = requests.Session()
+    session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=retry))
+    return session
+
 @st.cache_data(ttl=datetime.timedelta(hours=24), show_spinner=False)
-def generate_daily_motivation(task_list, current_date):
+def generate_daily_motivation(task_names, current_date):
     """
     Calls the Gemini API to get a daily motivational tip.
-    Uses Streamlit caching to ensure it runs only once per day.
+    Uses Streamlit caching to ensure it runs only once per day; task_names
+    should be a sorted tuple so the cache key doesn't depend on task order.
+    Raises on failure so an error is never cached for the rest of the day.
     """
-    st.session_state.is_generating = True
+    task_list = ", ".join(task_names)
 
     system_prompt = "You are a positive and insightful personal coach for habit building. Your goal is to provide a single, concise, and highly motivating tip or quote (maximum two sentences) based on the user's current habits. Focus on the value of consistency and overcoming daily resistance. Do not include titles or prefixes like 'Tip: ' or 'Quote: '."
 
@@ -84,76 +103,97 @@ def generate_daily_motivation(task_list, current_date):
         "systemInstruction": {"parts": [{"text": system_prompt}]},
     }
 
-    result_text = "Couldn't connect to the habit coach. Try again later."
+    response = get_http_session().post(
+        api_url,
+        headers={'Content-Type': 'application/json'},
+        json=payload,
+        timeout=REQUEST_TIMEOUT,
+    )
+    response.raise_for_status()
 
-    for i in range(MAX_ATTEMPTS):
-        try:
-            response = requests.post(api_url, headers={'Content-Type': 'application/json'}, json=payload)
-            response.raise_for_status()
+    result = response.json()
+    text = result.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text')
 
-            result = response.json()
-            text = result.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text')
+    if not text:
+        raise ValueError("Gemini response contained no text")
 
-            if text:
-                result_text = text
-                break
+    return text
 
+def fetch_motivation_in_background(data, task_names, current_date):
+    """
+    Fetches the daily tip on a worker thread so the page paints without
+    waiting on the network. The result is written straight into the
+    tracker data; the motivation panel picks it up on its next run.
+    """
+    def worker():
+        try:
+            data['dailyMotivation'] = generate_daily_motivation(task_names, current_date)
         except Exception as e:
-            # print(f"Attempt {i + 1} failed: {e}") # Suppressing console logs as per instructions
-            if i < MAX_ATTEMPTS - 1:
-                delay = 2 ** i
-                import time; time.sleep(delay)
-            else:
-                result_text = "Failed to get motivation after several retries."
-
-
-    # Update session state with the result and the date it was generated
-    st.session_state.tracker_data['dailyMotivation'] = result_text
-    st.session_state.tracker_data['lastMotivationDate'] = current_date
-    st.session_state.is_generating = False
-    st.rerun() # Rerun to update the main app UI with the new motivation
+            # print(f"Request failed: {e}") # Suppressing console logs as per instructions
+            data['dailyMotivation'] = "Failed to get motivation after several retries."
+        finally:
+            data['lastMotivationDate'] = current_date
 
-    return result_text # Must return a value for st.cache_data
+    thread = threading.Thread(target=worker, daemon=True)
+    add_script_run_ctx(thread)
+    thread.start()
 
 # --- Data Processing and Calculation ---
 
-def calculate_completion_data(data):
-    """Calculates the daily completion percentage history."""
-    tasks = data['tasks']
-    daily_status = data['dailyStatus']
-    start_date_str = data['config']['startDate']
-    total_days = data['config']['totalDays']
-
-    history = []
-
-    current_date = start_date_str
-    days_count = 0
-
-    while current_date <= today and days_count < total_days:
-        status = daily_status.get(current_date, {})
-        completed_count = sum(1 for task in tasks if status.get(task['id']) is True)
+def get_completed_cells(daily_status):
+    """
+    Flattens dailyStatus into a sorted tuple of completed (date, task_id) pairs.
+    Independent of dict ordering, so hash() of it is a stable content fingerprint.
+    """
+    return tuple(sorted(
+        (date_str, task_id)
+        for date_str, status_map in daily_status.items()
+        for task_id, is_complete in status_map.items()
+        if is_complete is True
+    ))
 
-        completion_rate = (completed_count / len(tasks) * 100) if tasks else 0
+def build_status_frame(start_date_str, total_days, task_ids, completed_cells, today_str):
+    """
+    Builds a boolean frame for the tracking window:
+    one row per tracked day (YYYY-MM-DD) up to today, one column per task id.
+    """
+    # Walk the window as day ordinals; only format the days actually shown
+    start_ord = datetime.date.fromisoformat(start_date_str).toordinal()
+    end_ord = min(start_ord + total_days, datetime.date.fromisoformat(today_str).toordinal() + 1)
+    date_index = pd.Index(
+        [datetime.date.fromordinal(ordinal).isoformat() for ordinal in range(start_ord, end_ord)],
+        name='Date',
+    )
+    task_index = pd.Index(task_ids)
 
-        history.append({
-            'Date': datetime.datetime.strptime(current_date, "%Y-%m-%d"),
-            'Completion (%)': round(completion_rate),
-        })
+    status = np.zeros((len(date_index), len(task_index)), dtype=np.bool_)
+    if completed_cells:
+        rows = date_index.get_indexer([date_str for date_str, _ in completed_cells])
+        cols = task_index.get_indexer([task_id for _, task_id in completed_cells])
+        # Cells outside the window or for removed tasks come back as -1
+        in_range = (rows >= 0) & (cols >= 0)
+        status[rows[in_range], cols[in_range]] = True
 
-        current_date = add_days(current_date, 1)
-        days_count += 1
+    return pd.DataFrame(status, index=date_index, columns=task_index)
 
-    df = pd.DataFrame(history)
+def calculate_completion_data(status_df, graph_view):
+    """Calculates the daily completion percentage history."""
+    if len(status_df.index) == 0:
+        return pd.DataFrame(), []
 
-    if df.empty:
-        return df, []
+    if len(status_df.columns):
+        rates = np.round(status_df.mean(axis=1).to_numpy() * 100).astype(int)
+    else:
+        rates = np.zeros(len(status_df.index), dtype=int)
 
-    df['Date'] = pd.to_datetime(df['Date'])
+    # Rows are consecutive days, so rebuild the dates instead of parsing the index
+    dates = pd.date_range(status_df.index[0], periods=len(status_df.index))
+    df = pd.DataFrame({'Date': dates, 'Completion (%)': rates})
 
     # Filter based on graph_view state
-    if st.session_state.graph_view == 'week':
+    if graph_view == 'week':
         days = 7
-    elif st.session_state.graph_view == 'month':
+    elif graph_view == 'month':
         days = 30
     else: # 'all'
         days = len(df)
@@ -163,30 +203,51 @@ def calculate_completion_data(data):
 
     return df, filtered_df
 
-df_full, df_filtered = calculate_completion_data(tracker_data)
+@st.cache_data(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def compute_tracker_frames(start_date_str, total_days, task_ids, status_fingerprint, today_str, graph_view, _completed_cells):
+    """
+    Returns (status_df, df_full, df_filtered, csv_bytes) for the given
+    tracker content, where csv_bytes is the filtered history as UTF-8 CSV.
+    Cached so reruns that don't touch the data (expanders, downloads,
+    text input) skip the recomputation. The cells themselves are excluded
+    from the cache key (leading underscore); status_fingerprint stands in
+    for them so Streamlit hashes one int instead of every pair.
+    """
+    status_df = build_status_frame(start_date_str, total_days, task_ids, _completed_cells, today_str)
+    df_full, df_filtered = calculate_completion_data(status_df, graph_view)
+    csv_bytes = df_filtered.to_csv(index=False).encode('utf-8') if len(df_filtered) else b''
+    return status_df, df_full, df_filtered, csv_bytes
+
+completed_cells = get_completed_cells(tracker_data['dailyStatus'])
+# Cheap cache key shared by everything derived from the tracker content
+frames_key = (
+    tracker_data['config']['startDate'],
+    tracker_data['config']['totalDays'],
+    tuple(task['id'] for task in tracker_data['tasks']),
+    hash(completed_cells),
+    TODAY_STR,
+    st.session_state.graph_view,
+)
+status_df, df_full, df_filtered, csv_bytes = compute_tracker_frames(*frames_key, _completed_cells=completed_cells)
 
 # --- UI Functions ---
 
-def render_completion_chart(df):
-    """Renders the interactive Plotly line chart."""
-    if df.empty:
-        st.warning("No tracking data available for the selected period.")
-        return
-
-    # Determine the time period for the title
-    if st.session_state.graph_view == 'week':
-        period = "Last 7 Days"
-    elif st.session_state.graph_view == 'month':
-        period = "Last 30 Days"
-    else:
-        period = "All Time"
+@st.cache_resource(max_entries=CACHE_MAX_ENTRIES, show_spinner=False)
+def build_completion_figure(frames_key, period, _df):
+    """
+    Builds the completion line chart for _df.
+    Cached on frames_key (the tracker content key) rather than the plotted
+    values; the figure is shared by reference, so callers must not mutate it.
+    """
+    dates = _df['Date']
+    completion = _df['Completion (%)']
 
     fig = go.Figure()
 
     # Shaded Area (Fill)
     fig.add_trace(go.Scatter(
-        x=df['Date'],
-        y=df['Completion (%)'],
+        x=dates,
+        y=completion,
         fill='tozeroy',
         mode='lines',
         line_color='#818CF8',
@@ -197,14 +258,14 @@ def render_completion_chart(df):
 
     # Line
     fig.add_trace(go.Scatter(
-        x=df['Date'],
-        y=df['Completion (%)'],
+        x=dates,
+        y=completion,
         mode='lines+markers',
         line=dict(color='#4F46E5', width=3),
         marker=dict(size=8, color='#4F46E5', line=dict(width=2, color='White')),
         name='Completion Rate',
         hoverinfo='text',
-        hovertext=[f"{date.strftime('%b %d')}<br>{comp}%" for date, comp in zip(df['Date'], df['Completion (%)'])]
+        hovertext=dates.dt.strftime('%b %d') + '<br>' + completion.astype(str) + '%'
     ))
 
     fig.update_layout(
@@ -223,12 +284,29 @@ def render_completion_chart(df):
     fig.add_hline(y=75, line_width=1, line_dash="dash", line_color="green", opacity=0.5,
                   annotation_text="Target 75%", annotation_position="top right")
 
-    st.plotly_chart(fig, use_container_width=True)
+    return fig
+
+def render_completion_chart(df, frames_key):
+    """Renders the interactive Plotly line chart."""
+    if df.empty:
+        st.warning("No tracking data available for the selected period.")
+        return
+
+    # Determine the time period for the title
+    if st.session_state.graph_view == 'week':
+        period = "Last 7 Days"
+    elif st.session_state.graph_view == 'month':
+        period = "Last 30 Days"
+    else:
+        period = "All Time"
+
+    fig = build_completion_figure(frames_key, period, df)
+    st.plotly_chart(fig, use_container_width=True, key="completion_chart")
 
 def handle_add_task():
     """Adds a new task to the tracker data."""
     if st.session_state.new_task_name.strip():
-        new_id = f'task-{datetime.datetime.now().timestamp()}'
+        new_id = f'task-{time.time_ns()}'
         st.session_state.tracker_data['tasks'].append({
             'id': new_id,
             'name': st.session_state.new_task_name.strip()
@@ -242,18 +320,13 @@ def handle_remove_task(task_id):
     st.session_state.tracker_data['tasks'] = [
         t for t in st.session_state.tracker_data['tasks'] if t['id'] != task_id
     ]
-    # Clean up daily status
-    new_daily_status = {}
-    for date, status_map in st.session_state.tracker_data['dailyStatus'].items():
-        new_daily_status[date] = {
-            k: v for k, v in status_map.items() if k != task_id
-        }
-    st.session_state.tracker_data['dailyStatus'] = new_daily_status
-    st.rerun()
+    # Clean up daily status in place; one pop per day instead of copying every entry
+    for status_map in st.session_state.tracker_data['dailyStatus'].values():
+        status_map.pop(task_id, None)
 
 def handle_update_task_status(date, task_id, is_complete):
     """Updates the completion status of a task for a given day."""
-    if date > today:
+    if date > TODAY_STR:
         st.warning("Cannot check off future tasks.")
         return
 
@@ -267,8 +340,13 @@ def handle_update_task_status(date, task_id, is_complete):
     if not is_complete and task_id in st.session_state.tracker_data['dailyStatus'][date]:
          del st.session_state.tracker_data['dailyStatus'][date][task_id]
 
-    # Rerun to update the graph immediately
-    st.rerun()
+def handle_grid_edit(task_ids):
+    """Applies the cells edited in the checklist grid to the tracker data."""
+    # Edits are absolute values keyed by row position and column (date string),
+    # so replaying all of them is idempotent
+    for row, changes in st.session_state.checklist_grid['edited_rows'].items():
+        for date_str, is_complete in changes.items():
+            handle_update_task_status(date_str, task_ids[int(row)], bool(is_complete))
 
 def handle_update_config():
     """Updates the tracking period configuration."""
@@ -276,7 +354,7 @@ def handle_update_config():
         new_days = int(st.session_state.new_total_days)
         if 1 <= new_days <= 365:
             st.session_state.tracker_data['config']['totalDays'] = new_days
-            st.session_state.tracker_data['config']['startDate'] = get_formatted_date(datetime.datetime.now())
+            st.session_state.tracker_data['config']['startDate'] = TODAY_STR
         else:
             st.error("Total days must be between 1 and 365.")
     except ValueError:
@@ -304,24 +382,33 @@ st.title(" Habit Master Tracker")
 st.caption("Track your consistency. Build your habits using Streamlit and Gemini.")
 
 # --- Automatic Daily Motivation ---
-current_date = get_formatted_date(datetime.datetime.now())
-task_names = [t['name'] for t in tracker_data['tasks']]
-task_list_str = ", ".join(task_names)
+task_names = tuple(sorted(t['name'] for t in tracker_data['tasks']))
 
-if current_date != tracker_data['lastMotivationDate'] and not st.session_state.is_generating:
-    # Trigger motivation generation
-    generate_daily_motivation(task_list_str, current_date)
+if TODAY_STR != tracker_data['lastMotivationDate'] and not st.session_state.is_generating:
+    # Trigger motivation generation without blocking the first paint
+    st.session_state.is_generating = True
+    fetch_motivation_in_background(tracker_data, task_names, TODAY_STR)
 
 st.subheader("Daily Boost ✨")
-motivation_container = st.container(border=True)
 
-with motivation_container:
-    if st.session_state.is_generating:
-        st.info("Generating your daily dose of motivation...", icon="⏳")
-    elif tracker_data['dailyMotivation']:
-        st.markdown(f"**💡 Insight:** *{tracker_data['dailyMotivation']}*")
-    else:
-        st.info("Your daily motivation will appear here automatically!")
+# Poll only while a request is in flight; otherwise this is a plain render
+@st.fragment(run_every=datetime.timedelta(seconds=1) if st.session_state.is_generating else None)
+def render_daily_motivation():
+    """Renders the motivation panel and refreshes the app once the tip arrives."""
+    data = st.session_state.tracker_data
+    if st.session_state.is_generating and data['lastMotivationDate'] == TODAY_STR:
+        st.session_state.is_generating = False
+        st.rerun() # Rerun once so the fragment stops polling
+
+    with st.container(border=True):
+        if st.session_state.is_generating:
+            st.info("Generating your daily dose of motivation...", icon="⏳")
+        elif data['dailyMotivation']:
+            st.markdown(f"**💡 Insight:** *{data['dailyMotivation']}*")
+        else:
+            st.info("Your daily motivation will appear here automatically!")
+
+render_daily_motivation()
 
 # --- Configuration Section ---
 st.subheader("Tracker Setup")
@@ -385,17 +472,15 @@ with col_view:
     )
 
 with col_download:
-    # Prepare CSV data for download
-    csv = df_filtered.to_csv(index=False).encode('utf-8')
     st.download_button(
         label="Download CSV",
-        data=csv,
+        data=csv_bytes,
         file_name=f"habit_tracker_completion_{st.session_state.graph_view}.csv",
         mime='text/csv',
         use_container_width=True
     )
 
-render_completion_chart(df_filtered)
+render_completion_chart(df_filtered, frames_key)
 
 # --- Tracker Grid Section (Daily Checklist) ---
 st.subheader("Daily Checklist")
@@ -403,27 +488,35 @@ st.subheader("Daily Checklist")
 if not tracker_data['tasks']:
     st.info("Add tasks above to start tracking your habits!", icon="📝")
 else:
-    # Create the header row for the table
-    header_cols = st.columns([3] + [1] * df_full.shape[0])
-    header_cols[0].markdown("**Task**", unsafe_allow_html=True)
-
-    # Calculate headers: we only show days from start_date up to today
-    for i, date_obj in enumerate(df_full['Date']):
-        date_str = date_obj.strftime("%Y-%m-%d")
-        day_label = date_obj.strftime("%a %d")
-
-        style = f"font-weight: bold; color: {'#4F46E5' if date_str == today else '#6B7280'};"
-
-        header_cols[i + 1].markdown(f"<div style='text-align: center; {style}'>{day_label}</div>", unsafe_allow_html=True)
-
-    st.divider()
+    task_ids = [task['id'] for task in tracker_data['tasks']]
+    date_strs = status_df.index.tolist()
+    day_labels = df_full['Date'].dt.strftime("%a %d").tolist()
+
+    # One row per task, one checkbox column per tracked day
+    grid_df = status_df.T
+    grid_df.insert(0, 'Task', [task['name'] for task in tracker_data['tasks']])
+
+    column_config = {'Task': st.column_config.TextColumn("Task", width="medium")}
+    for date_str, day_label in zip(date_strs, day_labels):
+        # Mark today's column in its label, as the old header colour did
+        column_config[date_str] = st.column_config.CheckboxColumn(
+            f"{day_label} •" if date_str == TODAY_STR else day_label,
+            width="small",
+        )
 
-    # Create task rows
-    for task in tracker_data['tasks']:
-        cols = st.columns([3] + [1] * df_full.shape[0])
+    st.data_editor(
+        grid_df,
+        key='checklist_grid',
+        column_config=column_config,
+        disabled=['Task'] + [date_str for date_str in date_strs if date_str > TODAY_STR],
+        hide_index=True,
+        use_container_width=True,
+        on_change=handle_grid_edit,
+        args=(task_ids,),
+    )
 
-        # Column 1: Task Name and Remove Button
-        with cols[0]:
+    with st.expander("Remove Tasks", expanded=False):
+        for task in tracker_data['tasks']:
             col_name, col_remove = st.columns([4, 1])
             col_name.markdown(f"**{task['name']}**")
             col_remove.button(
@@ -434,21 +527,3 @@ else:
                 help="Remove this task",
                 use_container_width=True
             )
-
-        # Remaining Columns: Checkboxes for each day
-        for i, date_obj in enumerate(df_full['Date']):
-            date_str = date_obj.strftime("%Y-%m-%d")
-
-            is_checked = tracker_data['dailyStatus'].get(date_str, {}).get(task['id'], False)
-
-            with cols[i + 1]:
-                # Use a unique key for each checkbox
-                st.checkbox(
-                    label=task['name'], # Provide a non-empty label
-                    value=is_checked,
-                    key=f"check_{task['id']}_{date_str}",
-                    on_change=handle_update_task_status,
-                    args=(date_str, task['id'], not is_checked),
-                    disabled=date_str > today,
-                    label_visibility='collapsed'
-                )